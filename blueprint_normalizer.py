@@ -22,6 +22,8 @@ class BlueprintNormalizer:
         canonical = normalizer.normalize('51_84*')  # Returns '1_84'
     """
     
+    __slots__ = ('mapping', '_cache')
+    
     # Pattern to parse blueprint IDs: set_card with optional suffixes
     ID_PATTERN = re.compile(r'^(\d+)_(\d+)([*T]*)$')
     
@@ -33,6 +35,9 @@ class BlueprintNormalizer:
             mapping_file: Path to blueprintMapping.txt
         """
         self.mapping = {}
+        # Normalized results by raw ID; ingest sees the same few thousand IDs
+        # in every game. Cleared whenever the mapping changes.
+        self._cache = {}
         
         if mapping_file:
             self._load_mapping(mapping_file)
@@ -57,6 +62,8 @@ class BlueprintNormalizer:
                 
                 source, target = parts[0].strip(), parts[1].strip()
                 self.mapping[source] = target
+        
+        self._cache.clear()
     
     def normalize(self, blueprint_id: str) -> str:
         """
@@ -76,6 +83,10 @@ class BlueprintNormalizer:
         if not blueprint_id:
             return blueprint_id
         
+        cached = self._cache.get(blueprint_id)
+        if cached is not None:
+            return cached
+        
         # Step 1: Strip cosmetic suffixes
         cleaned = self._strip_suffixes(blueprint_id)
         
@@ -85,6 +96,7 @@ class BlueprintNormalizer:
         # Step 3: Apply mapping lookup (with chain resolution)
         canonical = self._resolve_mapping(adjusted)
         
+        self._cache[blueprint_id] = canonical
         return canonical
     
     def _strip_suffixes(self, blueprint_id: str) -> str:
@@ -126,9 +138,10 @@ class BlueprintNormalizer:
         current = blueprint_id
         
         for _ in range(max_depth):
-            if current not in self.mapping:
+            target = self.mapping.get(current)
+            if target is None:
                 return current
-            current = self.mapping[current]
+            current = target
         
         # If we hit max depth, something is wrong with the mapping
         return current
@@ -136,6 +149,7 @@ class BlueprintNormalizer:
     def add_mapping(self, source: str, target: str):
         """Add a mapping at runtime (for testing or API updates)."""
         self.mapping[source] = target
+        self._cache.clear()
     
     def get_mapping_count(self) -> int:
         """Return number of loaded mappings."""
@@ -14,7 +14,8 @@ class Config:
     Configuration container with INI file and environment variable support.
     
     Environment variables override INI values:
-        GEMP_DB_HOST, GEMP_DB_PORT, GEMP_DB_USER, GEMP_DB_PASSWORD, GEMP_DB_NAME
+        GEMP_DB_HOST, GEMP_DB_PORT, GEMP_DB_USER, GEMP_DB_PASSWORD, GEMP_DB_NAME,
+        GEMP_DB_COMPRESS
         GEMP_REPLAY_PATH, GEMP_MAPPING_FILE
     """
     
@@ -31,6 +32,10 @@ class Config:
         self.db_user = self._get('database', 'user', 'GEMP_DB_USER', 'gemp')
         self.db_password = self._get('database', 'password', 'GEMP_DB_PASSWORD', '')
         self.db_name = self._get('database', 'name', 'GEMP_DB_NAME', 'gemp_db')
+        # Protocol compression for bulk ingest; only worth it to a remote DB host
+        self.db_compress = self._get(
+            'database', 'compress', 'GEMP_DB_COMPRESS', 'false'
+        ).lower() in ('1', 'true', 'yes', 'on')
         
         # File paths
         self.replay_base_path = self._get('paths', 'replay_base', 'REPLAY_PATH', '/replay')
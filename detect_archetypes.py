@@ -26,17 +26,28 @@ Usage:
     python detect_archetypes.py --format "Fellowship Block"
     python detect_archetypes.py --min-lift 1.5            # Stricter edge threshold
     python detect_archetypes.py --resolution 7.5          # More granular communities
+    python detect_archetypes.py --resolution 1 5 7.5 --dry-run  # Compare resolutions on one graph build
+    python detect_archetypes.py --backend cugraph         # GPU Louvain via nx-cugraph
     python detect_archetypes.py --flex-min-connections 4  # Stricter flex detection
     python detect_archetypes.py --no-flex                 # Skip flex detection
+    python detect_archetypes.py --no-cache                # Rebuild graphs from the database
+    python detect_archetypes.py --workers 4               # Detect 4 formats in parallel
     python detect_archetypes.py --dry-run                 # Preview without inserting
 """
 
 import argparse
-import gc
+import gzip
+import hashlib
+import heapq
 import logging
+import multiprocessing
+import pickle
 import sys
 from collections import defaultdict
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
+from pathlib import Path
 from typing import Optional
 
 import mysql.connector
@@ -49,6 +60,13 @@ except ImportError:
     print("ERROR: networkx required. Install with: pip install networkx")
     sys.exit(1)
 
+try:
+    import numpy as np
+    import scipy.sparse
+except ImportError:
+    print("ERROR: numpy and scipy required. Install with: pip install numpy scipy")
+    sys.exit(1)
+
 from config import Config
 
 # Configure logging
@@ -62,42 +80,173 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows pulled per round-trip when streaming correlations into the graph
+FETCH_BATCH_SIZE = 10000
+
+SIDES = ['free_peoples', 'shadow']
+
+# Built graphs are pickled (gzipped) here, keyed on query params + a fingerprint of the correlation rows
+GRAPH_CACHE_DIR = Path('./cache')
+
+# Bump when graph construction changes, so graphs cached by older code are not reused
+GRAPH_CACHE_VERSION = 1
+
+# Blueprints looked up per card_catalog query (keeps IN lists bounded)
+CATALOG_BATCH_SIZE = 1000
+
+# blueprint -> card name, filled lazily by get_card_names()
+_CATALOG: dict[str, str] = {}
+
 
-def build_correlation_graph(
+def build_correlation_graphs(
     cursor, 
     format_name: str, 
-    side: str, 
     patch_id: int,
     min_lift: float, 
     min_together: int
-) -> nx.Graph:
+) -> dict[str, nx.Graph]:
     """
-    Build a weighted graph from card correlations for a specific patch.
+    Build weighted graphs from card correlations for a specific patch, one per side.
+    
+    Both sides come from a single query and are split in memory. The side
+    predicate keeps it to two full-prefix ranges on idx_format_patch_lift.
     
     Nodes = cards
     Edges = correlations with lift >= min_lift
     Edge weight = lift value
     """
     cursor.execute("""
-        SELECT card_a, card_b, lift, together_count
+        SELECT side, card_a, card_b, lift
         FROM card_correlations
         WHERE format_name = %s 
-          AND side = %s
+          AND side IN (%s, %s)
+          AND patch_id = %s
+          AND lift >= %s
+          AND together_count >= %s
+    """, (format_name, *SIDES, patch_id, min_lift, min_together))
+    
+    graphs = {side: nx.Graph() for side in SIDES}
+    
+    # Stream rows in batches rather than materializing the whole result set
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        for side, G in graphs.items():
+            G.add_weighted_edges_from(
+                (card_a, card_b, lift) for row_side, card_a, card_b, lift in rows if row_side == side
+            )
+    
+    for side, G in graphs.items():
+        logger.info(f"  Built {format_name} {side} graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    return graphs
+
+
+def get_correlations_fingerprint(
+    cursor,
+    format_name: str,
+    patch_id: int,
+    min_lift: float,
+    min_together: int
+) -> Optional[str]:
+    """
+    Fingerprint the correlation rows a graph would be built from, used to
+    invalidate cached graphs. compute_correlations rewrites every row (with a
+    fresh computed_at) when it refreshes a format, so MAX(computed_at) plus the
+    row count changes whenever the data does. Uses the same predicate as
+    build_correlation_graphs, so it reads the same index range.
+    Returns None if there are no rows.
+    """
+    cursor.execute("""
+        SELECT MAX(computed_at), COUNT(*)
+        FROM card_correlations
+        WHERE format_name = %s
+          AND side IN (%s, %s)
           AND patch_id = %s
           AND lift >= %s
           AND together_count >= %s
-    """, (format_name, side, patch_id, min_lift, min_together))
+    """, (format_name, *SIDES, patch_id, min_lift, min_together))
+    row = cursor.fetchone()
+    if not row or not row[1]:
+        return None
+    return f"{row[0]}|{row[1]}"
+
+
+def graph_cache_path(
+    fingerprint: str,
+    format_name: str,
+    patch_id: int,
+    min_lift: float,
+    min_together: int
+) -> Path:
+    """
+    Cache file for a format's graphs built with the given query parameters.
+    
+    Named graph_<params>_<data>.pkl.gz, so older versions for the same
+    parameters can be found and pruned.
+    """
+    params = repr((GRAPH_CACHE_VERSION, format_name, patch_id, min_lift, min_together))
+    params_key = hashlib.sha256(params.encode()).hexdigest()[:16]
+    data_key = hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+    return GRAPH_CACHE_DIR / f"graph_{params_key}_{data_key}.pkl.gz"
+
+
+def load_correlation_graphs(
+    cursor,
+    format_name: str,
+    patch_id: int,
+    min_lift: float,
+    min_together: int,
+    use_cache: bool = True
+) -> dict[str, nx.Graph]:
+    """
+    Build the per-side correlation graphs, reusing a cached copy from an earlier
+    run when the format/patch's correlations haven't changed since.
+    """
+    fingerprint = None
+    if use_cache:
+        fingerprint = get_correlations_fingerprint(
+            cursor, format_name, patch_id, min_lift, min_together
+        )
+    if not fingerprint:
+        return build_correlation_graphs(cursor, format_name, patch_id, min_lift, min_together)
+    
+    cache_path = graph_cache_path(fingerprint, format_name, patch_id, min_lift, min_together)
+    if cache_path.exists():
+        try:
+            with gzip.open(cache_path, 'rb') as f:
+                graphs = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError) as e:
+            # Truncated file, or pickled under a different networkx: rebuild
+            logger.warning(f"  Discarding unreadable graph cache {cache_path.name}: {e}")
+            cache_path.unlink(missing_ok=True)
+        else:
+            logger.info(f"  Loaded cached graphs for {format_name}")
+            return graphs
+    
+    graphs = build_correlation_graphs(cursor, format_name, patch_id, min_lift, min_together)
     
-    G = nx.Graph()
+    GRAPH_CACHE_DIR.mkdir(exist_ok=True)
+    tmp_path = cache_path.with_suffix('.tmp')
+    # Fast compression level: the edge lists shrink well and load time stays low
+    with gzip.open(tmp_path, 'wb', compresslevel=1) as f:
+        pickle.dump(graphs, f, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path.replace(cache_path)
     
-    for card_a, card_b, lift, together in cursor.fetchall():
-        G.add_edge(card_a, card_b, weight=lift, together=together)
+    # Drop graphs cached for these parameters from older correlation data
+    params_prefix = cache_path.name.rsplit('_', 1)[0]
+    for old_path in GRAPH_CACHE_DIR.glob(f"{params_prefix}_*.pkl.gz"):
+        if old_path != cache_path:
+            old_path.unlink(missing_ok=True)
     
-    logger.info(f"  Built graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
-    return G
+    return graphs
 
 
-def detect_communities(G: nx.Graph, resolution: float = 1.0) -> dict[str, int]:
+def detect_communities(
+    G: nx.Graph,
+    resolution: float = 1.0,
+    backend: Optional[str] = None
+) -> dict[str, int]:
     """
     Run Louvain community detection on the graph.
     
@@ -106,12 +255,18 @@ def detect_communities(G: nx.Graph, resolution: float = 1.0) -> dict[str, int]:
     Resolution parameter controls granularity:
     - Higher = more, smaller communities
     - Lower = fewer, larger communities
+    
+    backend selects a networkx dispatch backend (e.g. 'cugraph' for GPU Louvain
+    via nx-cugraph); None uses the built-in implementation.
     """
     if G.number_of_nodes() == 0:
         return {}
     
     # Louvain returns a list of sets, each set is a community
-    communities = nx_community.louvain_communities(G, weight='weight', resolution=resolution)
+    backend_kwargs = {'backend': backend} if backend else {}
+    communities = nx_community.louvain_communities(
+        G, weight='weight', resolution=resolution, **backend_kwargs
+    )
     
     # Convert to card -> community_id mapping
     card_to_community = {}
@@ -122,23 +277,34 @@ def detect_communities(G: nx.Graph, resolution: float = 1.0) -> dict[str, int]:
     logger.info(f"  Found {len(communities)} communities")
     
     # Log community sizes
-    sizes = [len(c) for c in communities]
-    sizes.sort(reverse=True)
-    logger.info(f"  Largest communities: {sizes[:10]}")
+    sizes = heapq.nlargest(10, (len(c) for c in communities))
+    logger.info(f"  Largest communities: {sizes}")
     
     return card_to_community
 
 
+def build_lift_matrix(G: nx.Graph) -> tuple[scipy.sparse.csr_array, list[str]]:
+    """
+    Convert the graph to a symmetric CSR matrix of lifts.
+    
+    Returns the matrix and the node list giving each row's card blueprint.
+    float32 is lossless here: lift is stored as a single-precision FLOAT.
+    """
+    nodelist = list(G.nodes())
+    W = nx.to_scipy_sparse_array(
+        G, nodelist=nodelist, weight='weight', dtype=np.float32, format='csr'
+    )
+    return W, nodelist
+
+
 def compute_community_stats(
-    G: nx.Graph, 
+    W: scipy.sparse.csr_array,
+    nodelist: list[str],
     communities: dict[str, int],
-    cursor,
-    format_name: str,
-    side: str,
     min_community_size: int = 7,
 ) -> tuple[list[dict], list[str]]:
     """
-    Compute statistics for each community.
+    Compute statistics for each community from the lift matrix (see build_lift_matrix).
     
     Returns:
         - List of community info dicts (communities meeting size threshold)
@@ -152,6 +318,23 @@ def compute_community_stats(
     results = []
     orphaned_cards = []
     
+    node_index = {card: i for i, card in enumerate(nodelist)}
+    
+    # Tally every community's internal edges in one pass over the matrix:
+    # an entry is internal when both endpoints share a label
+    labels = np.array([communities[card] for card in nodelist], dtype=np.int64)
+    coo = W.tocoo()
+    internal = labels[coo.row] == labels[coo.col]
+    internal_rows = coo.row[internal]
+    internal_labels = labels[internal_rows]
+    n_labels = int(labels.max()) + 1 if len(labels) else 0
+    
+    # Symmetric, so every internal edge is counted twice
+    lift_totals = np.bincount(internal_labels, weights=coo.data[internal], minlength=n_labels) * 0.5
+    edge_counts = np.bincount(internal_labels, minlength=n_labels) // 2
+    # Each card's edges to other members of its community
+    card_internal_edges = np.bincount(internal_rows, minlength=len(nodelist))
+    
     for comm_id, cards in community_cards.items():
         # Communities below threshold become orphans
         if len(cards) < min_community_size:
@@ -159,21 +342,19 @@ def compute_community_stats(
             continue
         
         # Compute average internal lift
-        internal_lifts = []
-        for i, card_a in enumerate(cards):
-            for card_b in cards[i+1:]:
-                if G.has_edge(card_a, card_b):
-                    internal_lifts.append(G[card_a][card_b]['weight'])
+        internal_lift_total = float(lift_totals[comm_id])
+        internal_edge_count = int(edge_counts[comm_id])
         
-        avg_lift = sum(internal_lifts) / len(internal_lifts) if internal_lifts else 0
+        avg_lift = internal_lift_total / internal_edge_count if internal_edge_count else 0
         
         # Compute membership scores (how connected each card is within community)
-        membership_scores = {}
-        for card in cards:
-            # Count edges to other community members
-            internal_edges = sum(1 for neighbor in G.neighbors(card) if neighbor in cards)
-            max_possible = len(cards) - 1
-            membership_scores[card] = internal_edges / max_possible if max_possible > 0 else 0
+        internal_edges = card_internal_edges[[node_index[card] for card in cards]]
+        max_possible = len(cards) - 1
+        if max_possible > 0:
+            scores = (internal_edges / max_possible).tolist()
+        else:
+            scores = [0] * len(cards)
+        membership_scores = dict(zip(cards, scores))
         
         results.append({
             'community_id': comm_id,
@@ -277,21 +458,29 @@ def update_orphan_pool(
 
 
 def get_card_names(cursor, blueprints: list) -> dict[str, str]:
-    """Fetch card names from catalog."""
-    if not blueprints:
-        return {}
-    """Fetch card names from catalog."""
-    if not blueprints:
-        return {}
+    """
+    Fetch card names from catalog (falls back to the blueprint).
     
-    placeholders = ','.join(['%s'] * len(blueprints))
-    cursor.execute(f"""
-        SELECT blueprint, card_name 
-        FROM card_catalog 
-        WHERE blueprint IN ({placeholders})
-    """, blueprints)
+    Names are cached for the run, so only blueprints not seen by an earlier
+    preview are queried, in batches of CATALOG_BATCH_SIZE.
+    """
+    missing = list({bp for bp in blueprints if bp not in _CATALOG})
+    
+    for start in range(0, len(missing), CATALOG_BATCH_SIZE):
+        batch = missing[start:start + CATALOG_BATCH_SIZE]
+        placeholders = ','.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            SELECT blueprint, card_name 
+            FROM card_catalog 
+            WHERE blueprint IN ({placeholders})
+        """, batch)
+        found = dict(cursor.fetchall())
+        
+        # Cache misses too, so unknown blueprints aren't queried again
+        for bp in batch:
+            _CATALOG[bp] = found.get(bp, bp)
     
-    return {row[0]: row[1] for row in cursor.fetchall()}
+    return {bp: _CATALOG[bp] for bp in blueprints}
 
 
 def insert_communities(
@@ -318,59 +507,76 @@ def insert_communities(
         for comm in community_stats[:15]:
             logger.info(f"\n  Archetype {comm['community_id']}: {comm['card_count']} cards, avg_lift={comm['avg_internal_lift']}")
             # Show top 10 cards by membership score
-            top_cards = sorted(comm['membership_scores'].items(), key=lambda x: x[1], reverse=True)[:10]
+            top_cards = heapq.nlargest(10, comm['membership_scores'].items(), key=lambda x: x[1])
             for card, score in top_cards:
                 name = card_names.get(card, card)
                 logger.info(f"    {card} ({name}): score={score:.2f}")
         return []
     
-    # Clear existing communities for this format/side/patch (all members including custom)
-    cursor.execute("""
-        DELETE ccm FROM card_community_members ccm
-        JOIN card_communities cc ON ccm.community_id = cc.id
-        WHERE cc.format_name = %s AND cc.side = %s AND cc.patch_id = %s AND cc.is_orphan_pool = FALSE
-    """, (format_name, side, patch_id))
-    
-    cursor.execute("""
-        DELETE FROM card_communities 
-        WHERE format_name = %s AND side = %s AND patch_id = %s AND is_orphan_pool = FALSE
-    """, (format_name, side, patch_id))
-    conn.commit()
-    
-    db_community_ids = []
-    
-    # Insert each community
-    for comm in community_stats:
-        # Insert community with default name based on Louvain cluster number
-        archetype_name = f"Archetype #{comm['community_id']}"
+    # Replace the old communities in a single transaction, so a failed run
+    # leaves the previous set in place
+    try:
+        # Clear existing communities for this format/side/patch (all members including custom)
         cursor.execute("""
+            DELETE ccm FROM card_community_members ccm
+            JOIN card_communities cc ON ccm.community_id = cc.id
+            WHERE cc.format_name = %s AND cc.side = %s AND cc.patch_id = %s AND cc.is_orphan_pool = FALSE
+        """, (format_name, side, patch_id))
+        
+        cursor.execute("""
+            DELETE FROM card_communities 
+            WHERE format_name = %s AND side = %s AND patch_id = %s AND is_orphan_pool = FALSE
+        """, (format_name, side, patch_id))
+        
+        # Insert all communities with default names based on Louvain cluster number
+        archetype_names = [f"Archetype #{comm['community_id']}" for comm in community_stats]
+        cursor.executemany("""
             INSERT INTO card_communities 
                 (format_name, side, patch_id, card_count, avg_internal_lift, archetype_name)
             VALUES (%s, %s, %s, %s, %s, %s)
-        """, (format_name, side, patch_id, comm['card_count'], comm['avg_internal_lift'], archetype_name))
+        """, [
+            (format_name, side, patch_id, comm['card_count'], comm['avg_internal_lift'], name)
+            for comm, name in zip(community_stats, archetype_names)
+        ])
         
-        db_community_id = cursor.lastrowid
-        db_community_ids.append(db_community_id)
+        # Recover the generated ids via the (format, side, patch, name) unique key
+        cursor.execute("""
+            SELECT archetype_name, id FROM card_communities
+            WHERE format_name = %s AND side = %s AND patch_id = %s AND is_orphan_pool = FALSE
+        """, (format_name, side, patch_id))
+        id_by_name = dict(cursor.fetchall())
+        db_community_ids = [id_by_name[name] for name in archetype_names]
         
-        # Insert members as 'core' type
-        member_data = [
+        # Collect members as 'core' type
+        all_members = [
             (db_community_id, card, score, score >= 0.5, 'core')
+            for comm, db_community_id in zip(community_stats, db_community_ids)
             for card, score in comm['membership_scores'].items()
         ]
         
-        cursor.executemany("""
-            INSERT INTO card_community_members 
-                (community_id, card_blueprint, membership_score, is_core, membership_type)
-            VALUES (%s, %s, %s, %s, %s)
-        """, member_data)
+        # Insert members for all communities in one batch (executemany sends a
+        # single multi-row INSERT)
+        if all_members:
+            cursor.executemany("""
+                INSERT INTO card_community_members 
+                    (community_id, card_blueprint, membership_score, is_core, membership_type)
+                VALUES (%s, %s, %s, %s, %s)
+            """, all_members)
+        
+        conn.commit()
+    
+    except MySQLError as e:
+        conn.rollback()
+        logger.error(f"Database error replacing communities: {e}")
+        raise
     
-    conn.commit()
     logger.info(f"  Inserted {len(community_stats)} communities for {format_name} {side}")
     return db_community_ids
 
 
 def find_flex_cards(
-    G: nx.Graph,
+    W: scipy.sparse.csr_array,
+    nodelist: list[str],
     community_stats: list[dict],
     communities: dict[str, int],
     min_core_connections_pct: float = 0.3,
@@ -381,7 +587,8 @@ def find_flex_cards(
     they weren't assigned to by Louvain.
     
     Parameters:
-        G: Correlation graph
+        W: Symmetric lift matrix of the correlation graph (see build_lift_matrix)
+        nodelist: Card blueprint for each row/column of W
         community_stats: List of community stat dicts (with 'cards', 'membership_scores')
         communities: Card -> community_id mapping from Louvain
         min_core_connections_pct: Min fraction of core cards a flex card must connect to (0-1)
@@ -391,38 +598,34 @@ def find_flex_cards(
         {community_id: [(card_blueprint, avg_lift, num_connections), ...]}
     """
     flex_by_community = defaultdict(list)
+    node_index = {card: i for i, card in enumerate(nodelist)}
     
     for comm in community_stats:
         comm_id = comm['community_id']
         
         # Get core cards (membership_score >= 0.5)
-        core_cards = {card for card, score in comm['membership_scores'].items() if score >= 0.5}
+        core_idx = [node_index[card] for card, score in comm['membership_scores'].items() if score >= 0.5]
         
-        if len(core_cards) < 3:
+        if len(core_idx) < 3:
             continue  # Not enough core cards to meaningfully detect flex
         
         # Calculate minimum connections required (round up to be stricter)
-        min_connections = max(2, int(len(core_cards) * min_core_connections_pct + 0.5))
+        min_connections = max(2, int(len(core_idx) * min_core_connections_pct + 0.5))
         
-        # Get all cards already in this community
-        comm_cards = set(comm['cards'])
+        # W is symmetric, so the core cards' rows list every card's edges to the
+        # core: tally connection counts and lift sums per card in one pass
+        core_rows = W[core_idx]
+        connections = np.bincount(core_rows.indices, minlength=len(nodelist))
+        lift_sums = np.bincount(core_rows.indices, weights=core_rows.data, minlength=len(nodelist))
         
-        # Find candidates: cards NOT in this community but in the graph
-        all_graph_nodes = set(G.nodes())
-        candidates = all_graph_nodes - comm_cards
+        # Candidates: cards NOT in this community with enough core connections
+        connections[[node_index[card] for card in comm['cards']]] = 0
+        candidates = np.flatnonzero(connections >= min_connections)
+        avg_lifts = lift_sums[candidates] / connections[candidates]
         
-        for candidate in candidates:
-            # Count connections to core cards and compute average lift
-            connections = []
-            for core_card in core_cards:
-                if G.has_edge(candidate, core_card):
-                    lift = G[candidate][core_card].get('weight', 0)
-                    connections.append(lift)
-            
-            if len(connections) >= min_connections:
-                avg_lift = sum(connections) / len(connections)
-                if avg_lift >= min_avg_lift:
-                    flex_by_community[comm_id].append((candidate, avg_lift, len(connections)))
+        keep = avg_lifts >= min_avg_lift
+        for i, avg_lift in zip(candidates[keep].tolist(), avg_lifts[keep].tolist()):
+            flex_by_community[comm_id].append((nodelist[i], avg_lift, int(connections[i])))
     
     # Sort by avg_lift descending within each community
     for comm_id in flex_by_community:
@@ -529,6 +732,106 @@ def get_available_formats(cursor, patch_id: int) -> list[str]:
     return [row[0] for row in cursor.fetchall()]
 
 
+def connect_db(config: Config):
+    """Open a database connection using the loaded configuration."""
+    return mysql.connector.connect(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        database=config.db_name
+    )
+
+
+def detect_format(
+    cursor,
+    format_name: str,
+    patch_id: int,
+    args: argparse.Namespace,
+) -> dict[str, list[dict]]:
+    """
+    Build the graphs and run detection for both sides of a format.
+    
+    Only reads through cursor; all writes are left to the caller.
+    Returns {side: results} (see analyze_graph).
+    """
+    # Build graphs from correlations for this patch
+    graphs = load_correlation_graphs(
+        cursor, format_name, patch_id,
+        args.min_lift, args.min_together, use_cache=not args.no_cache
+    )
+    
+    return {side: analyze_graph(G, format_name, side, args) for side, G in graphs.items()}
+
+
+def process_format(
+    config_file: str,
+    format_name: str,
+    patch_id: int,
+    args: argparse.Namespace,
+) -> dict[str, list[dict]]:
+    """
+    Run detect_format in a worker process, on the worker's own database connection.
+    """
+    conn = connect_db(Config(config_file))
+    cursor = conn.cursor()
+    try:
+        return detect_format(cursor, format_name, patch_id, args)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def analyze_graph(
+    G: nx.Graph,
+    format_name: str,
+    side: str,
+    args: argparse.Namespace,
+) -> list[dict]:
+    """
+    Run detection, stats and flex-card search on one format/side graph.
+    
+    The graph is shared by every requested resolution. Returns one result per
+    resolution, or an empty list if the graph is too small for meaningful
+    communities.
+    """
+    if G.number_of_nodes() < 10:
+        logger.info(f"  {format_name} {side}: too few cards for meaningful communities, skipping")
+        return []
+    
+    W, nodelist = build_lift_matrix(G)
+    
+    results = []
+    for resolution in args.resolution:
+        # Detect communities
+        communities = detect_communities(G, resolution=resolution, backend=args.backend)
+        
+        if not communities:
+            logger.info(f"  {format_name} {side}: no communities detected at resolution {resolution}")
+            continue
+        
+        # Compute stats (returns tuple: stats list, orphaned cards)
+        stats, orphaned_cards = compute_community_stats(W, nodelist, communities)
+        
+        # Find flex cards
+        flex_cards = {}
+        if not args.no_flex:
+            flex_cards = find_flex_cards(
+                W, nodelist, stats, communities,
+                min_core_connections_pct=args.flex_min_connections,
+                min_avg_lift=args.flex_min_lift
+            )
+        
+        results.append({
+            'resolution': resolution,
+            'stats': stats,
+            'orphaned_cards': orphaned_cards,
+            'flex_cards': flex_cards,
+        })
+    
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(description='GEMP Archetype Detection')
     parser.add_argument('--format', type=str, help='Specific format to analyze')
@@ -537,8 +840,11 @@ def main():
                         help='Minimum lift for correlation edges (default: 1.5)')
     parser.add_argument('--min-together', type=int, default=50,
                         help='Minimum co-occurrences for edges (default: 50)')
-    parser.add_argument('--resolution', type=float, default=1.0,
-                        help='Louvain resolution: higher=more communities (default: 1.0)')
+    parser.add_argument('--resolution', type=float, nargs='+', default=[1.0],
+                        help='Louvain resolution: higher=more communities (default: 1.0). '
+                             'Several values sweep one graph build (dry run only)')
+    parser.add_argument('--backend', type=str, default=None,
+                        help="networkx backend for Louvain, e.g. 'cugraph' (requires nx-cugraph and a CUDA GPU)")
     parser.add_argument('--flex-min-connections', type=float, default=0.3,
                         help='Min fraction of core cards a flex card must connect to (0-1, default: 0.3)')
     parser.add_argument('--flex-min-lift', type=float, default=2.0,
@@ -547,21 +853,29 @@ def main():
                         help='Skip flex card detection')
     parser.add_argument('--dry-run', action='store_true',
                         help='Preview without inserting')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always rebuild correlation graphs instead of using ./cache')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for detection; 1 runs in-process (default: 1)')
     parser.add_argument('--config', default='config.ini', help='Config file path')
     args = parser.parse_args()
     
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
+    if args.backend and args.backend not in nx.utils.backends.backends:
+        parser.error(f"networkx backend '{args.backend}' is not installed")
+    
+    # Stored communities have no resolution column, so a sweep can only be previewed
+    if len(args.resolution) > 1 and not args.dry_run:
+        parser.error('multiple --resolution values require --dry-run')
+    
     # Load configuration
     config = Config(args.config)
     
     # Connect to database
     try:
-        conn = mysql.connector.connect(
-            host=config.db_host,
-            port=config.db_port,
-            user=config.db_user,
-            password=config.db_password,
-            database=config.db_name
-        )
+        conn = connect_db(config)
         cursor = conn.cursor()
         logger.info("Connected to database")
     except MySQLError as e:
@@ -607,58 +921,68 @@ def main():
             
             logger.info(f"Processing {len(formats)} formats")
             
-            for format_name in formats:
-                logger.info(f"\n=== Processing {format_name} ===")
+            # With --workers > 1, detection runs in worker processes (each with its
+            # own connection); otherwise it reads through this connection. Results
+            # are always stored serially on this connection.
+            # Parallelism is opt-in: each worker imports numpy/scipy/networkx and
+            # builds its own graphs, which the default container limits can't spare.
+            max_workers = min(args.workers, len(formats))
+            
+            with (
+                ProcessPoolExecutor(
+                    max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                ) if max_workers > 1 else nullcontext()
+            ) as executor:
+                futures = {
+                    format_name: executor.submit(
+                        process_format, args.config, format_name, patch_id, args
+                    )
+                    for format_name in formats
+                } if executor else {}
                 
-                for side in ['free_peoples', 'shadow']:
-                    logger.info(f"\n--- {side.replace('_', ' ').title()} ---")
+                for format_name in formats:
+                    logger.info(f"\n=== Processing {format_name} ===")
                     
                     try:
-                        # Build graph from correlations for this patch
-                        G = build_correlation_graph(
-                            cursor, format_name, side, patch_id,
-                            args.min_lift, args.min_together
-                        )
-                        
-                        if G.number_of_nodes() < 10:
-                            logger.info("  Too few cards for meaningful communities, skipping")
-                            continue
-                        
-                        # Detect communities
-                        communities = detect_communities(G, resolution=args.resolution)
-                        
-                        if not communities:
-                            logger.info("  No communities detected")
-                            continue
-                        
-                        # Compute stats (returns tuple: stats list, orphaned cards)
-                        stats, orphaned_cards = compute_community_stats(G, communities, cursor, format_name, side)
-                        
-                        # Store core communities
-                        db_ids = insert_communities(cursor, conn, format_name, side, patch_id, stats, args.dry_run)
-                        
-                        # Find and insert flex cards
-                        if not args.no_flex:
-                            flex_cards = find_flex_cards(
-                                G, stats, communities,
-                                min_core_connections_pct=args.flex_min_connections,
-                                min_avg_lift=args.flex_min_lift
-                            )
-                            if flex_cards:
-                                insert_flex_cards(cursor, conn, db_ids, stats, flex_cards, args.dry_run)
-                        
-                        # Handle orphaned cards
-                        update_orphan_pool(cursor, conn, format_name, side, patch_id, orphaned_cards, args.dry_run)
-                        
-                        # Cleanup
-                        del G, communities, stats
-                        gc.collect()
-                        
+                        if executor:
+                            side_results = futures[format_name].result()
+                        else:
+                            side_results = detect_format(cursor, format_name, patch_id, args)
                     except Exception as e:
-                        logger.error(f"Error processing {format_name} {side}: {e}")
+                        logger.error(f"Error processing {format_name}: {e}")
                         import traceback
                         logger.error(traceback.format_exc())
                         continue
+                    
+                    for side in SIDES:
+                        logger.info(f"\n--- {side.replace('_', ' ').title()} ---")
+                        
+                        try:
+                            for result in side_results[side]:
+                                if len(args.resolution) > 1:
+                                    logger.info(f"\n  Resolution {result['resolution']}:")
+                                
+                                stats = result['stats']
+                                
+                                # Store core communities
+                                db_ids = insert_communities(cursor, conn, format_name, side, patch_id, stats, args.dry_run)
+                                
+                                # Insert flex cards
+                                if result['flex_cards']:
+                                    insert_flex_cards(cursor, conn, db_ids, stats, result['flex_cards'], args.dry_run)
+                                
+                                # Handle orphaned cards
+                                update_orphan_pool(
+                                    cursor, conn, format_name, side, patch_id,
+                                    result['orphaned_cards'], args.dry_run
+                                )
+                            
+                        except Exception as e:
+                            logger.error(f"Error processing {format_name} {side}: {e}")
+                            import traceback
+                            logger.error(traceback.format_exc())
+                            continue
         
         logger.info("\nArchetype detection complete!")
     
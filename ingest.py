@@ -9,6 +9,7 @@ Usage:
     python ingest.py                    # Process all unprocessed games
     python ingest.py --limit 1000       # Process up to 1000 games
     python ingest.py --dry-run          # Validate without inserting
+    python ingest.py --workers 16       # Read summary files on 16 threads
 """
 
 import argparse
@@ -16,11 +17,12 @@ import json
 import logging
 import os
 import sys
-from collections import Counter
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 import mysql.connector
 from mysql.connector import Error as MySQLError
@@ -28,6 +30,12 @@ from mysql.connector import Error as MySQLError
 from config import Config
 from blueprint_normalizer import BlueprintNormalizer
 
+# orjson parses summaries several times faster; fall back to the stdlib parser
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -58,6 +66,10 @@ TARGET_FORMATS = frozenset([
     "Limited - TH",
 ])
 
+# IN-list for get_unprocessed_games, built once
+TARGET_FORMAT_PARAMS = tuple(TARGET_FORMATS)
+TARGET_FORMAT_PLACEHOLDERS = ','.join(['%s'] * len(TARGET_FORMAT_PARAMS))
+
 DECISIVE_REASONS = frozenset([
     "Surviving to end of Regroup phase on site 9",
     "Surviving to Regroup phase on site 9",
@@ -81,6 +93,12 @@ AMBIGUOUS_REASONS = frozenset([
     "Last remaining player in game",  # Catch-all, check other reason first
 ])
 
+# Unprocessed games are fetched from game_history in pages of this size
+GAME_PAGE_SIZE = 1000
+
+# Summaries are read this many games ahead of the game being processed
+SUMMARY_PREFETCH = 64
+
 # Known bot usernames (case-insensitive comparison)
 KNOWN_BOTS = frozenset([
     "~bot",
@@ -102,7 +120,7 @@ def is_bot_player(username: str) -> bool:
     return username.lower() in KNOWN_BOTS
 
 
-@dataclass
+@dataclass(slots=True)
 class GameRecord:
     """Represents a game from game_history that needs processing."""
     game_id: int
@@ -120,7 +138,7 @@ class GameRecord:
     end_date: datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class ProcessedGame:
     """Represents a fully processed game ready for insertion."""
     game_id: int
@@ -134,9 +152,8 @@ class ProcessedGame:
     competitive_tier: int
     winner_site: Optional[int]
     loser_site: Optional[int]
-    winner_cards: list  # [(blueprint, role, count), ...]
+    winner_cards: list  # [(blueprint, role, count, was_played), ...]
     loser_cards: list
-    played_blueprints: set  # Set of normalized blueprints that were actually played
 
 
 def classify_outcome_tier(win_reason: str, lose_reason: str, winner_site: Optional[int]) -> int:
@@ -170,7 +187,32 @@ def classify_outcome_tier(win_reason: str, lose_reason: str, winner_site: Option
     return 3
 
 
-def classify_competitive_tier(tournament_name: Optional[str], cursor) -> int:
+def tournament_key(name: str) -> str:
+    """
+    Normalize a tournament name the way the old ``WHERE name = %s`` lookup
+    compared it: MySQL's default collation ignores case and trailing spaces.
+    """
+    return name.casefold().rstrip()
+
+
+def get_tournament_ids(cursor) -> dict[str, str]:
+    """
+    Load tournament names and ids once, so classifying a game's competitive
+    tier needs no per-game query. Keys are normalized with tournament_key().
+    """
+    cursor.execute("SELECT name, tournament_id FROM tournament")
+    
+    tournament_ids = {}
+    for name, tournament_id in cursor.fetchall():
+        if name is None:
+            continue
+        # Keep the first row per name, as the old LIMIT 1 lookup did
+        tournament_ids.setdefault(tournament_key(name), tournament_id or "")
+    
+    return tournament_ids
+
+
+def classify_competitive_tier(tournament_name: Optional[str], tournament_ids: dict[str, str]) -> int:
     """
     Classify competitive context.
     
@@ -187,14 +229,9 @@ def classify_competitive_tier(tournament_name: Optional[str], cursor) -> int:
         return 2
     
     # Check tournaments first
-    cursor.execute(
-        "SELECT tournament_id FROM tournament WHERE name = %s LIMIT 1",
-        (tournament_name,)
-    )
-    row = cursor.fetchone()
-    if row:
-        tournament_id = (row[0] or "").lower()
-        if 'wc' in tournament_id:
+    tournament_id = tournament_ids.get(tournament_key(tournament_name))
+    if tournament_id is not None:
+        if 'wc' in tournament_id.lower():
             return 4
         return 3
     
@@ -202,37 +239,39 @@ def classify_competitive_tier(tournament_name: Optional[str], cursor) -> int:
     return 1
 
 
-def extract_deck_cards(deck_data: dict, normalizer: BlueprintNormalizer) -> list:
+def extract_deck_cards(deck_data: dict, normalizer: BlueprintNormalizer, played_blueprints: set) -> list:
     """
     Extract and normalize cards from deck data.
     
-    Returns list of (card_blueprint, card_role, count) tuples.
+    Returns list of (card_blueprint, card_role, count, was_played) tuples.
     """
     cards = []
     
-    # Draw deck - count duplicates
+    # Draw deck - count duplicates after normalizing, so printings of the same
+    # card (foil, tengwar, errata) add up to one row
     draw_deck = deck_data.get('DrawDeck', deck_data.get('drawDeck', [])) 
-    draw_counts = Counter(draw_deck)
-    for card_id, count in draw_counts.items():
-        normalized = normalizer.normalize(card_id)
-        cards.append((normalized, 'draw_deck', count))
+    draw_counts = Counter(normalizer.normalize(card_id) for card_id in draw_deck)
+    cards.extend(
+        (blueprint, 'draw_deck', count, blueprint in played_blueprints)
+        for blueprint, count in draw_counts.items()
+    )
     
     # Sites (adventure deck)
     for card_id in deck_data.get('AdventureDeck', deck_data.get('adventureDeck', [])):
         normalized = normalizer.normalize(card_id)
-        cards.append((normalized, 'site', 1))
+        cards.append((normalized, 'site', 1, normalized in played_blueprints))
     
     # Ring-bearer
     ring_bearer = deck_data.get('RingBearer', deck_data.get('ringBearer')) 
     if ring_bearer:
         normalized = normalizer.normalize(ring_bearer)
-        cards.append((normalized, 'ring_bearer', 1))
+        cards.append((normalized, 'ring_bearer', 1, normalized in played_blueprints))
     
     # Ring
     ring = deck_data.get('Ring', deck_data.get('ring')) 
     if ring:
         normalized = normalizer.normalize(ring)
-        cards.append((normalized, 'ring', 1))
+        cards.append((normalized, 'ring', 1, normalized in played_blueprints))
     
     return cards
 
@@ -275,8 +314,8 @@ def construct_summary_path(game: GameRecord, base_path: Path) -> Path:
 def load_summary(path: Path) -> Optional[dict]:
     """Load and validate JSON summary file."""
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(path, 'rb') as f:
+            data = json_loads(f.read())
         
         # Validate metadata version
         if data.get('MetadataVersion', data.get('metadataVersion', 0)) < 2:
@@ -296,13 +335,47 @@ def load_summary(path: Path) -> Optional[dict]:
         return None
 
 
-def get_unprocessed_games(cursor, limit: Optional[int] = 500) -> list:
+def iter_summaries(games: Iterable[GameRecord], base_path: Path, workers: int = 8):
     """
-    Query game_history for games not yet in game_analysis.
-    Filters to target formats.
+    Yield (game, summary) pairs in order, loading summaries on a thread pool
+    up to SUMMARY_PREFETCH games ahead so file reads overlap processing.
+    
+    Bot games are yielded with a None summary without reading the file.
     """
-    format_placeholders = ','.join(['%s'] * len(TARGET_FORMATS))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        games_iter = iter(games)
+        
+        def submit_next() -> bool:
+            game = next(games_iter, None)
+            if game is None:
+                return False
+            if is_bot_player(game.winner) or is_bot_player(game.loser):
+                pending.append((game, None))
+            else:
+                path = construct_summary_path(game, base_path)
+                pending.append((game, executor.submit(load_summary, path)))
+            return True
+        
+        while len(pending) < SUMMARY_PREFETCH and submit_next():
+            pass
+        
+        while pending:
+            game, future = pending.popleft()
+            submit_next()
+            yield game, future.result() if future else None
+
+
+def get_unprocessed_games(cursor, limit: Optional[int] = 500, page_size: int = GAME_PAGE_SIZE):
+    """
+    Yield games from game_history not yet in game_analysis, in id order
+    (i.e. the order games were recorded). Filters to target formats.
     
+    Games are fetched a page at a time, continuing after the last id seen.
+    Paging on the primary key lets each page resume with an index range
+    scan rather than re-reading and sorting every remaining candidate.
+    A limit of None or 0 means no limit.
+    """
     query = f"""
         SELECT 
             gh.id,
@@ -319,47 +392,55 @@ def get_unprocessed_games(cursor, limit: Optional[int] = 500) -> list:
             gh.start_date,
             gh.end_date
         FROM game_history gh
-        LEFT JOIN game_analysis ga ON gh.id = ga.game_id
-        WHERE ga.game_id IS NULL
-          AND gh.format_name IN ({format_placeholders})
+        WHERE NOT EXISTS (SELECT 1 FROM game_analysis ga WHERE ga.game_id = gh.id)
+          AND gh.format_name IN ({TARGET_FORMAT_PLACEHOLDERS})
           AND gh.win_recording_id IS NOT NULL
           AND gh.lose_recording_id IS NOT NULL
           AND gh.start_date > '2023-06-20'
-        ORDER BY gh.start_date ASC
+          AND gh.id > %s
+        ORDER BY gh.id ASC
+        LIMIT %s
     """
     # The date is after metadata version 2
     
-    if limit:
-        query += f" LIMIT {int(limit)}"
-    
-    cursor.execute(query, tuple(TARGET_FORMATS))
+    last_id = 0
+    remaining = limit or None
     
-    games = []
-    for row in cursor.fetchall():
-        games.append(GameRecord(
-            game_id=row[0],
-            winner=row[1],
-            loser=row[2],
-            winner_id=row[3],
-            loser_id=row[4],
-            win_recording_id=row[5],
-            lose_recording_id=row[6],
-            win_reason=row[7],
-            lose_reason=row[8],
-            format_name=row[9],
-            tournament=row[10],
-            start_date=row[11],
-            end_date=row[12],
-        ))
-    
-    return games
+    while remaining is None or remaining > 0:
+        batch_size = page_size if remaining is None else min(page_size, remaining)
+        cursor.execute(query, TARGET_FORMAT_PARAMS + (last_id, batch_size))
+        rows = cursor.fetchall()
+        
+        for row in rows:
+            yield GameRecord(
+                game_id=row[0],
+                winner=row[1],
+                loser=row[2],
+                winner_id=row[3],
+                loser_id=row[4],
+                win_recording_id=row[5],
+                lose_recording_id=row[6],
+                win_reason=row[7],
+                lose_reason=row[8],
+                format_name=row[9],
+                tournament=row[10],
+                start_date=row[11],
+                end_date=row[12],
+            )
+        
+        if len(rows) < batch_size:
+            return
+        
+        last_id = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
 
 
 def process_game(
     game: GameRecord,
     summary: dict,
     normalizer: BlueprintNormalizer,
-    cursor
+    tournament_ids: dict[str, str]
 ) -> Optional[ProcessedGame]:
     """
     Process a single game into analytics format.
@@ -382,22 +463,22 @@ def process_game(
         
         # Classify tiers
         outcome_tier = classify_outcome_tier(game.win_reason, game.lose_reason, winner_site)
-        competitive_tier = classify_competitive_tier(game.tournament, cursor)
+        competitive_tier = classify_competitive_tier(game.tournament, tournament_ids)
         
-        # Extract deck cards
+        # Extract played cards (which blueprints actually saw play)
+        played_blueprints = extract_played_blueprints(summary, normalizer)
+        
+        # Extract deck cards, flagging played ones as we go
         winner_deck = decks.get(game.winner, {})
         loser_deck = decks.get(game.loser, {})
         
-        winner_cards = extract_deck_cards(winner_deck, normalizer)
-        loser_cards = extract_deck_cards(loser_deck, normalizer)
+        winner_cards = extract_deck_cards(winner_deck, normalizer, played_blueprints)
+        loser_cards = extract_deck_cards(loser_deck, normalizer, played_blueprints)
         
         if not winner_cards and not loser_cards:
             logger.warning(f"Game {game.game_id}: No deck data found")
             return None
         
-        # Extract played cards (which blueprints actually saw play)
-        played_blueprints = extract_played_blueprints(summary, normalizer)
-        
         return ProcessedGame(
             game_id=game.game_id,
             format_name=game.format_name,
@@ -412,7 +493,6 @@ def process_game(
             loser_site=loser_site,
             winner_cards=winner_cards,
             loser_cards=loser_cards,
-            played_blueprints=played_blueprints,
         )
     
     except Exception as e:
@@ -463,13 +543,11 @@ def insert_batch(conn, cursor, processed_games: list, dry_run: bool = False):
         
         cards_data = []
         for g in processed_games:
-            for blueprint, role, count in g.winner_cards:
-                was_played = blueprint in g.played_blueprints
+            for blueprint, role, count, was_played in g.winner_cards:
                 cards_data.append((
                     g.game_id, g.winner_player_id, blueprint, role, count, True, was_played
                 ))
-            for blueprint, role, count in g.loser_cards:
-                was_played = blueprint in g.played_blueprints
+            for blueprint, role, count, was_played in g.loser_cards:
                 cards_data.append((
                     g.game_id, g.loser_player_id, blueprint, role, count, False, was_played
                 ))
@@ -488,11 +566,15 @@ def insert_batch(conn, cursor, processed_games: list, dry_run: bool = False):
 
 def main():
     parser = argparse.ArgumentParser(description='GEMP Game Analytics Ingestion')
-    parser.add_argument('--limit', type=int, help='Maximum games to process')
+    parser.add_argument('--limit', type=int, help='Maximum games to process (0 = no limit)')
     parser.add_argument('--batch-size', type=int, default=500, help='Batch size for commits')
     parser.add_argument('--dry-run', action='store_true', help='Validate without inserting')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Threads reading summary files ahead of processing (default: 8)')
     parser.add_argument('--config', default='config.ini', help='Config file path')
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     
     # Load configuration
     config = Config(args.config)
@@ -508,7 +590,8 @@ def main():
             port=config.db_port,
             user=config.db_user,
             password=config.db_password,
-            database=config.db_name
+            database=config.db_name,
+            compress=config.db_compress
         )
         cursor = conn.cursor()
         logger.info("Connected to database")
@@ -517,34 +600,38 @@ def main():
         sys.exit(1)
     
     try:
-        # Get unprocessed games
-        games = get_unprocessed_games(cursor, args.limit)
-        logger.info(f"Found {len(games)} unprocessed games in target formats")
+        tournament_ids = get_tournament_ids(cursor)
+        logger.info(f"Loaded {len(tournament_ids)} tournaments")
         
-        if not games:
-            logger.info("No games to process")
-            return
+        # Unprocessed games are streamed page by page
+        games = get_unprocessed_games(cursor, args.limit)
         
         # Process in batches
         processed_batch = []
         stats = {'processed': 0, 'skipped': 0, 'errors': 0, 'bots': 0}
+        checked = 0
+        
+        summaries = iter_summaries(games, Path(config.replay_base_path), args.workers)
         
-        for i, game in enumerate(games):
+        for game, summary in summaries:
+            checked += 1
+            
+            # Progress logging
+            if checked % 1000 == 0:
+                logger.info(f"Progress: {checked} games checked")
+            
             # Skip games involving bots
             if is_bot_player(game.winner) or is_bot_player(game.loser):
                 stats['bots'] += 1
                 continue
             
-            # Load summary file
-            summary_path = construct_summary_path(game, Path(config.replay_base_path))
-            summary = load_summary(summary_path)
-            
+            # Summary file was loaded ahead by iter_summaries
             if summary is None:
                 stats['skipped'] += 1
                 continue
             
             # Process game
-            processed = process_game(game, summary, normalizer, cursor)
+            processed = process_game(game, summary, normalizer, tournament_ids)
             
             if processed is None:
                 stats['errors'] += 1
@@ -557,17 +644,17 @@ def main():
             if len(processed_batch) >= args.batch_size:
                 insert_batch(conn, cursor, processed_batch, args.dry_run)
                 processed_batch = []
-            
-            # Progress logging
-            if (i + 1) % 1000 == 0:
-                logger.info(f"Progress: {i + 1}/{len(games)} games checked")
+        
+        if not checked:
+            logger.info("No games to process")
+            return
         
         # Final batch
         if processed_batch:
             insert_batch(conn, cursor, processed_batch, args.dry_run)
         
         logger.info(
-            f"Complete. Processed: {stats['processed']}, "
+            f"Complete. Checked: {checked}, Processed: {stats['processed']}, "
             f"Skipped: {stats['skipped']}, Bots: {stats['bots']}, Errors: {stats['errors']}"
         )
     
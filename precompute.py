@@ -9,12 +9,15 @@ Usage:
     python precompute.py                      # Compute stats for yesterday
     python precompute.py --date 2024-01-15    # Compute stats for specific date
     python precompute.py --rebuild            # Full rebuild of all stats
+    python precompute.py --rebuild --workers 4  # Rebuild 4 months at a time
     python precompute.py --dry-run            # Show what would be computed
 """
 
 import argparse
 import logging
 import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, date, timedelta
 from typing import Optional
 
@@ -53,11 +56,20 @@ def log_computation_end(cursor, log_id: int, records: int, status: str, error: s
     """, (records, status, error, log_id))
 
 
-def compute_daily_stats(cursor, target_date: date, dry_run: bool = False) -> int:
+def compute_daily_stats(
+    cursor, target_date: date, dry_run: bool = False, fresh: bool = False
+) -> int:
     """
     Compute card stats for a specific date.
     
-    Returns number of rows upserted.
+    Aggregation and upsert run server-side in one INSERT ... SELECT, so the
+    grouped rows never round-trip through the client.
+    
+    MySQL's affected-row count for an upsert is 2 per updated row and 0 per
+    unchanged one, so the aggregate is counted separately unless ``fresh``
+    says the date's rows were just cleared (every row is then an insert).
+    
+    Returns number of stat rows computed.
     """
     logger.info(f"Computing stats for {target_date}")
     
@@ -80,24 +92,20 @@ def compute_daily_stats(cursor, target_date: date, dry_run: bool = False) -> int
         GROUP BY gdc.card_blueprint, ga.format_name, ga.game_date, ga.outcome_tier, ga.competitive_tier
     """
     
-    cursor.execute(aggregate_sql, (target_date,))
-    rows = cursor.fetchall()
-    
     if dry_run:
-        logger.info(f"DRY RUN: Would upsert {len(rows)} stat rows for {target_date}")
-        return len(rows)
-    
-    if not rows:
-        logger.info(f"No games found for {target_date}")
-        return 0
+        cursor.execute(f"SELECT COUNT(*) FROM ({aggregate_sql}) agg", (target_date,))
+        count = cursor.fetchone()[0]
+        logger.info(f"DRY RUN: Would upsert {count} stat rows for {target_date}")
+        return count
     
     # Upsert into card_stats_daily
-    upsert_sql = """
+    upsert_sql = f"""
         INSERT INTO card_stats_daily (
             card_blueprint, format_name, stat_date, outcome_tier, competitive_tier,
             deck_appearances, deck_wins, total_copies,
             played_appearances, played_wins
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        )
+        {aggregate_sql}
         ON DUPLICATE KEY UPDATE
             deck_appearances = VALUES(deck_appearances),
             deck_wins = VALUES(deck_wins),
@@ -106,17 +114,36 @@ def compute_daily_stats(cursor, target_date: date, dry_run: bool = False) -> int
             played_wins = VALUES(played_wins)
     """
     
-    cursor.executemany(upsert_sql, rows)
-    logger.info(f"Upserted {len(rows)} stat rows for {target_date}")
+    if not fresh:
+        cursor.execute(f"SELECT COUNT(*) FROM ({aggregate_sql}) agg", (target_date,))
+        count = cursor.fetchone()[0]
+        if not count:
+            logger.info(f"No games found for {target_date}")
+            return 0
+    
+    cursor.execute(upsert_sql, (target_date,))
+    if fresh:
+        count = max(cursor.rowcount, 0)
+        if not count:
+            logger.info(f"No games found for {target_date}")
+            return 0
     
-    return len(rows)
+    logger.info(f"Upserted {count} stat rows for {target_date}")
+    
+    return count
 
 
-def compute_daily_player_stats(cursor, target_date: date, dry_run: bool = False) -> int:
+def compute_daily_player_stats(
+    cursor, target_date: date, dry_run: bool = False, fresh: bool = False
+) -> int:
     """
     Compute unique players per card for a specific date.
     
-    Returns number of rows upserted.
+    Runs server-side as a single INSERT IGNORE ... SELECT. Rows that already
+    exist are skipped and not counted by MySQL, so the distinct rows are
+    counted separately unless ``fresh`` (see compute_daily_stats).
+    
+    Returns number of player stat rows computed.
     """
     logger.info(f"Computing player stats for {target_date}")
     
@@ -134,28 +161,37 @@ def compute_daily_player_stats(cursor, target_date: date, dry_run: bool = False)
         WHERE ga.game_date = %s
     """
     
-    cursor.execute(player_sql, (target_date,))
-    rows = cursor.fetchall()
-    
     if dry_run:
-        logger.info(f"DRY RUN: Would upsert {len(rows)} player stat rows for {target_date}")
-        return len(rows)
-    
-    if not rows:
-        logger.info(f"No player stats found for {target_date}")
-        return 0
+        cursor.execute(f"SELECT COUNT(*) FROM ({player_sql}) players", (target_date,))
+        count = cursor.fetchone()[0]
+        logger.info(f"DRY RUN: Would upsert {count} player stat rows for {target_date}")
+        return count
     
     # Upsert into card_stats_daily_players
-    upsert_sql = """
+    upsert_sql = f"""
         INSERT IGNORE INTO card_stats_daily_players (
             card_blueprint, format_name, stat_date, outcome_tier, competitive_tier, player_id
-        ) VALUES (%s, %s, %s, %s, %s, %s)
+        )
+        {player_sql}
     """
     
-    cursor.executemany(upsert_sql, rows)
-    logger.info(f"Upserted {len(rows)} player stat rows for {target_date}")
+    if not fresh:
+        cursor.execute(f"SELECT COUNT(*) FROM ({player_sql}) players", (target_date,))
+        count = cursor.fetchone()[0]
+        if not count:
+            logger.info(f"No player stats for {target_date}")
+            return 0
+    
+    cursor.execute(upsert_sql, (target_date,))
+    if fresh:
+        count = max(cursor.rowcount, 0)
+        if not count:
+            logger.info(f"No player stats for {target_date}")
+            return 0
     
-    return len(rows)
+    logger.info(f"Upserted {count} player stat rows for {target_date}")
+    
+    return count
 
 
 def get_all_game_dates(cursor) -> list:
@@ -164,62 +200,164 @@ def get_all_game_dates(cursor) -> list:
     return [row[0] for row in cursor.fetchall()]
 
 
-def rebuild_all_stats(conn, cursor, dry_run: bool = False) -> int:
+def rebuild_dates(
+    conn, dates: list, dry_run: bool = False, log_progress: bool = True
+) -> tuple[int, int]:
+    """
+    Recompute stats for the given dates on one connection.
+    
+    The stats tables must already be cleared for these dates, so each
+    statement's affected-row count is the exact number of rows written.
+    
+    Returns (stat rows, player stat rows).
+    """
+    # The same two statements run for every date, so prepare each once on its
+    # own cursor (a prepared cursor re-prepares whenever its SQL changes)
+    stats_cursor = conn.cursor(prepared=True)
+    player_cursor = conn.cursor(prepared=True)
+    
+    total_rows = 0
+    total_player_rows = 0
+    try:
+        for i, target_date in enumerate(dates):
+            rows = compute_daily_stats(stats_cursor, target_date, dry_run, fresh=True)
+            player_rows = compute_daily_player_stats(
+                player_cursor, target_date, dry_run, fresh=True
+            )
+            total_rows += rows
+            total_player_rows += player_rows
+            
+            # Commit periodically to avoid long transactions
+            if not dry_run and (i + 1) % 30 == 0:
+                conn.commit()
+                if log_progress:
+                    logger.info(f"Progress: {i + 1}/{len(dates)} dates processed")
+    finally:
+        stats_cursor.close()
+        player_cursor.close()
+    
+    if not dry_run:
+        conn.commit()
+    
+    return total_rows, total_player_rows
+
+
+def rebuild_month(config: Config, dates: list, dry_run: bool = False) -> tuple[int, int]:
+    """Recompute one month's dates on a dedicated connection (parallel rebuild worker)."""
+    conn = connect_db(config)
+    try:
+        return rebuild_dates(conn, dates, dry_run, log_progress=False)
+    except MySQLError:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def rebuild_all_stats(
+    conn,
+    cursor,
+    dry_run: bool = False,
+    config: Optional[Config] = None,
+    workers: int = 1,
+) -> int:
     """
     Full rebuild of all daily stats.
     
     Clears card_stats_daily and card_stats_daily_players, then recomputes from scratch.
+    With workers > 1, dates are split by month and each month is rebuilt on its
+    own connection; months write disjoint rows, so they don't conflict.
     """
     logger.info("Starting full rebuild of card_stats_daily and card_stats_daily_players")
     
     if not dry_run:
         cursor.execute("DELETE FROM card_stats_daily_players")
         cursor.execute("DELETE FROM card_stats_daily")
+        conn.commit()
         logger.info("Cleared existing stats")
     
     dates = get_all_game_dates(cursor)
     logger.info(f"Found {len(dates)} dates to process")
     
-    total_rows = 0
-    total_player_rows = 0
-    for i, target_date in enumerate(dates):
-        rows = compute_daily_stats(cursor, target_date, dry_run)
-        player_rows = compute_daily_player_stats(cursor, target_date, dry_run)
-        total_rows += rows
-        total_player_rows += player_rows
+    if workers <= 1 or config is None:
+        total_rows, total_player_rows = rebuild_dates(conn, dates, dry_run)
+    else:
+        months = defaultdict(list)
+        for target_date in dates:
+            months[(target_date.year, target_date.month)].append(target_date)
         
-        # Commit periodically to avoid long transactions
-        if not dry_run and (i + 1) % 30 == 0:
-            conn.commit()
-            logger.info(f"Progress: {i + 1}/{len(dates)} dates processed")
-    
-    if not dry_run:
-        conn.commit()
+        total_rows = 0
+        total_player_rows = 0
+        finished = []
+        failed = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(rebuild_month, config, month_dates, dry_run): month
+                for month, month_dates in months.items()
+            }
+            # Drain every future: the other months keep committing after one
+            # fails, so report exactly which months made it before raising
+            for done, future in enumerate(as_completed(futures), 1):
+                label = '%04d-%02d' % futures[future]
+                try:
+                    rows, player_rows = future.result()
+                except Exception as e:
+                    failed[label] = e
+                    logger.error(f"Month {label} failed: {e}")
+                else:
+                    finished.append(label)
+                    total_rows += rows
+                    total_player_rows += player_rows
+                logger.info(f"Progress: {done}/{len(months)} months processed")
+        
+        if failed:
+            logger.error(f"Rebuilt months: {', '.join(sorted(finished)) or 'none'}")
+            raise RuntimeError(
+                f"Rebuild failed for months: {', '.join(sorted(failed))}"
+            ) from next(iter(failed.values()))
     
     logger.info(f"Full rebuild complete. Stat rows: {total_rows}, Player rows: {total_player_rows}")
     return total_rows
 
 
+def connect_db(config: Config):
+    """Open a database connection using the loaded configuration."""
+    conn = mysql.connector.connect(
+        host=config.db_host,
+        port=config.db_port,
+        user=config.db_user,
+        password=config.db_password,
+        database=config.db_name
+    )
+    # Under REPEATABLE READ, INSERT ... SELECT takes shared next-key locks on
+    # the game_analysis/game_deck_cards rows it reads, blocking ingest until
+    # commit (up to 30 dates per transaction during a rebuild). READ COMMITTED
+    # reads them as a non-locking consistent read instead. This needs row-based
+    # binary logging (the MySQL 8 default) if binlog is enabled.
+    cursor = conn.cursor()
+    cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    cursor.close()
+    return conn
+
+
 def main():
     parser = argparse.ArgumentParser(description='GEMP Analytics Pre-computation')
     parser.add_argument('--date', type=str, help='Specific date to compute (YYYY-MM-DD)')
     parser.add_argument('--rebuild', action='store_true', help='Full rebuild of all stats')
     parser.add_argument('--dry-run', action='store_true', help='Show what would be computed')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Rebuild months in parallel on this many connections (default: 1)')
     parser.add_argument('--config', default='config.ini', help='Config file path')
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
     
     # Load configuration
     config = Config(args.config)
     
     # Connect to database
     try:
-        conn = mysql.connector.connect(
-            host=config.db_host,
-            port=config.db_port,
-            user=config.db_user,
-            password=config.db_password,
-            database=config.db_name
-        )
+        conn = connect_db(config)
         cursor = conn.cursor()
         logger.info("Connected to database")
     except MySQLError as e:
@@ -236,7 +374,7 @@ def main():
                 conn.commit()
             
             try:
-                total_rows = rebuild_all_stats(conn, cursor, args.dry_run)
+                total_rows = rebuild_all_stats(conn, cursor, args.dry_run, config, args.workers)
                 if log_id:
                     log_computation_end(cursor, log_id, total_rows, 'completed')
                     conn.commit()
@@ -96,6 +96,12 @@ class TestBlueprintNormalizerWithMapping(unittest.TestCase):
         self.normalizer.add_mapping('1_50', '1_51')
         # Foil version should strip suffix then map
         self.assertEqual(self.normalizer.normalize('1_50*'), '1_51')
+    
+    def test_mapping_added_after_normalize(self):
+        """Mappings added later should apply to IDs already normalized."""
+        self.assertEqual(self.normalizer.normalize('1_60'), '1_60')
+        self.normalizer.add_mapping('1_60', '1_61')
+        self.assertEqual(self.normalizer.normalize('1_60'), '1_61')
 
 
 class TestSetAdjustmentEdgeCases(unittest.TestCase):